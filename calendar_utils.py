@@ -1,69 +1,168 @@
-from icalendar import Calendar, Event
+from icalendar.prop import vDDDTypes
 import pandas as pd
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import logging
+import re
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Define EST timezone
-EST = pytz.timezone('America/New_York')
+EST = ZoneInfo('America/New_York')
+
+# Content line: NAME[;PARAM=value...]:value, where parameter values may be quoted
+CONTENT_LINE = re.compile(r'([A-Za-z0-9-]+)((?:;(?:"[^"]*"|[^:;"])*)*):(.*)')
+CONTENT_PARAM = re.compile(r';([A-Za-z0-9-]+)=("[^"]*"|[^;]*)')
+TEXT_ESCAPE = re.compile(r'\\([\\;,nN])')
+
+# Range pandas can hold at nanosecond precision; events outside it are skipped
+TIMESTAMP_MIN = pd.Timestamp.min.ceil('us').tz_localize('UTC')
+TIMESTAMP_MAX = pd.Timestamp.max.floor('us').tz_localize('UTC')
+
+def _unfold_lines(file):
+    """Yield logical content lines, joining folded continuation lines"""
+    current = None
+    first = True
+    for raw in file:
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        raw = raw.rstrip(b'\r\n')
+
+        # Ignore a UTF-8 byte order mark at the start of the file
+        if first:
+            raw = raw.removeprefix(b'\xef\xbb\xbf')
+            first = False
+
+        # Folded lines continue the previous line after one space or tab
+        if raw[:1] in (b' ', b'\t'):
+            if current is not None:
+                current += raw[1:]
+            continue
+
+        if current is not None:
+            yield current.decode('utf-8', errors='replace')
+        current = raw
+
+    if current is not None:
+        yield current.decode('utf-8', errors='replace')
+
+def _unescape_text(value):
+    """Undo RFC 5545 TEXT escaping"""
+    return TEXT_ESCAPE.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+def iter_vevents(file):
+    """Stream VEVENT blocks from an .ics file one at a time
+
+    Yields (summary, dtstart, dtend) tuples. Times are raw (value, params)
+    pairs; any property missing from the event is None.
+    """
+    lines = (line for line in _unfold_lines(file) if line)
+    if next(lines, '').upper() != 'BEGIN:VCALENDAR':
+        raise ValueError("File does not start with BEGIN:VCALENDAR")
+
+    in_event = False
+    nested = 0
+    props = {}
+
+    for line in lines:
+        match = CONTENT_LINE.match(line)
+        if not match:
+            continue
+        name, params, value = match.groups()
+        name = name.upper()
+
+        if name == 'BEGIN':
+            if in_event:
+                # Skip properties of sub-components such as VALARM
+                nested += 1
+            elif value.upper() == 'VEVENT':
+                in_event = True
+                props = {}
+        elif name == 'END':
+            if nested:
+                nested -= 1
+            elif in_event and value.upper() == 'VEVENT':
+                in_event = False
+                yield props.get('SUMMARY'), props.get('DTSTART'), props.get('DTEND')
+        elif in_event and not nested and name in ('SUMMARY', 'DTSTART', 'DTEND'):
+            if name == 'SUMMARY':
+                props[name] = _unescape_text(value)
+            else:
+                props[name] = (value, {
+                    key.upper(): val.strip('"') for key, val in CONTENT_PARAM.findall(params)
+                })
+
+def _decode_time(prop):
+    """Decode a raw DTSTART/DTEND value into a date or datetime"""
+    value, params = prop
+    return vDDDTypes.from_ical(value, timezone=params.get('TZID'))
 
 def parse_ics(file):
-    """Parse .ics file and return list of events with EST timezone"""
+    """Parse .ics file and return list of events with EST timezone
+
+    The file is streamed through iter_vevents, so only one event is held in
+    memory at a time instead of the whole icalendar object tree. Every
+    returned start and end is already converted to EST; the scheduler relies
+    on this and does not convert them again.
+    """
     try:
-        calendar = Calendar.from_ical(file.read())
-        events = []
-
-        for component in calendar.walk():
-            if component.name == "VEVENT":
-                try:
-                    # Safely get start and end times
-                    start_time = component.get('dtstart')
-                    end_time = component.get('dtend')
-
-                    # Skip events without proper start/end times
-                    if not start_time or not end_time:
-                        logger.warning(f"Skipping event due to missing time: {component.get('summary')}")
-                        continue
-
-                    start = start_time.dt
-                    end = end_time.dt
-
-                    # Convert datetime to EST
-                    if isinstance(start, datetime):
-                        if start.tzinfo is None:
-                            start = pytz.UTC.localize(start)
-                        start = start.astimezone(EST)
-                    else:
-                        # If it's a date, convert to datetime at start of day
-                        start = datetime.combine(start, datetime.min.time())
-                        start = EST.localize(start)
-
-                    if isinstance(end, datetime):
-                        if end.tzinfo is None:
-                            end = pytz.UTC.localize(end)
-                        end = end.astimezone(EST)
-                    else:
-                        # If it's a date, convert to datetime at end of day
-                        end = datetime.combine(end, datetime.max.time())
-                        end = EST.localize(end)
-
-                    events.append({
-                        'summary': str(component.get('summary', 'No Title')),
-                        'start': start,
-                        'end': end
-                    })
-                    logger.info(f"Parsed event: {start} - {end} ({component.get('summary')})")
-                except AttributeError as e:
-                    logger.warning(f"Skipping malformed event: {str(e)}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error processing event: {str(e)}")
+        summaries = []
+        raw_starts = []
+        raw_ends = []
+
+        for summary, start_prop, end_prop in iter_vevents(file):
+            try:
+                # Skip events without proper start/end times
+                if not start_prop or not end_prop:
+                    logger.warning(f"Skipping event due to missing time: {summary}")
                     continue
 
+                start = _decode_time(start_prop)
+                end = _decode_time(end_prop)
+
+                # Floating times are taken as UTC; timezone conversion happens in bulk below
+                if isinstance(start, datetime):
+                    if start.tzinfo is None:
+                        start = start.replace(tzinfo=timezone.utc)
+                else:
+                    # If it's a date, convert to datetime at start of day
+                    start = datetime.combine(start, datetime.min.time(), tzinfo=EST)
+
+                if isinstance(end, datetime):
+                    if end.tzinfo is None:
+                        end = end.replace(tzinfo=timezone.utc)
+                else:
+                    # If it's a date, convert to datetime at end of day
+                    end = datetime.combine(end, datetime.max.time(), tzinfo=EST)
+
+                # Check the range here so one bad event doesn't fail the bulk conversion
+                if start < TIMESTAMP_MIN or end > TIMESTAMP_MAX:
+                    raise ValueError(f"Event time out of supported range: {start} - {end}")
+
+                summaries.append('No Title' if summary is None else summary)
+                raw_starts.append(start)
+                raw_ends.append(end)
+            except AttributeError as e:
+                logger.warning(f"Skipping malformed event: {str(e)}")
+                continue
+            except Exception as e:
+                logger.error(f"Error processing event: {str(e)}")
+                continue
+
+        # Convert all times to EST in one vectorized pass
+        starts = pd.to_datetime(raw_starts, utc=True).tz_convert(EST).to_pydatetime()
+        ends = pd.to_datetime(raw_ends, utc=True).tz_convert(EST).to_pydatetime()
+
+        events = [
+            {'summary': summary, 'start': start, 'end': end}
+            for summary, start, end in zip(summaries, starts, ends)
+        ]
+        if logger.isEnabledFor(logging.DEBUG):
+            for event in events:
+                logger.debug("Parsed event: %s - %s (%s)", event['start'], event['end'], event['summary'])
+
         if not events:
             logger.warning("No valid events found in calendar file")
 
@@ -74,37 +173,56 @@ def parse_ics(file):
 
 def get_calendar_preview(slots):
     """Convert slots to pandas DataFrame for display"""
-    preview_data = []
-
-    for slot in slots:
-        # Ensure times are in EST
-        start_time = slot['start'].astimezone(EST)
-        end_time = slot['end'].astimezone(EST)
-
-        preview_data.append({
-            'Date': start_time.strftime('%Y-%m-%d'),
-            'Day': start_time.strftime('%A'),
-            'Start Time': start_time.strftime('%I:%M %p'),
-            'End Time': end_time.strftime('%I:%M %p'),
-            'Time Zone': 'EST'
-        })
-
-    df = pd.DataFrame(preview_data)
+    # Ensure times are in EST
+    start_times = pd.to_datetime([slot['start'] for slot in slots], utc=True).tz_convert(EST)
+    end_times = pd.to_datetime([slot['end'] for slot in slots], utc=True).tz_convert(EST)
+
+    # Format whole columns at once and hand them to the constructor together
+    df = pd.DataFrame({
+        'Date': start_times.strftime('%Y-%m-%d'),
+        'Day': start_times.strftime('%A'),
+        'Start Time': start_times.strftime('%I:%M %p'),
+        'End Time': end_times.strftime('%I:%M %p'),
+        'Time Zone': 'EST'
+    })
     return df
 
+def _escape_text(value):
+    """Apply RFC 5545 TEXT escaping"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _fold_line(line):
+    """Encode a content line, folding it into 75-octet chunks per RFC 5545"""
+    data = line.encode('utf-8')
+    chunks = []
+    start = 0
+    limit = 75
+    while len(data) - start > limit:
+        end = start + limit
+        # Don't split inside a multi-byte UTF-8 sequence
+        while (data[end] & 0xC0) == 0x80:
+            end -= 1
+        chunks.append(data[start:end])
+        start = end
+        limit = 74  # Continuation lines start with a space
+    chunks.append(data[start:])
+    return b'\r\n '.join(chunks) + b'\r\n'
+
 def export_ics(new_slots, meeting_title):
-    """Create new calendar with only the new scheduled meetings"""
-    cal = Calendar()
+    """Create new calendar with only the new scheduled meetings as .ics bytes"""
+    summary = _fold_line(f"SUMMARY:{_escape_text(meeting_title)}")
+    out = bytearray(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//AI Meeting Scheduler//EN\r\n")
 
     # Add only the new events
     for slot in new_slots:
-        new_event = Event()
-        new_event.add('summary', meeting_title)
         # Convert to UTC for ical format
-        start_utc = slot['start'].astimezone(pytz.UTC)
-        end_utc = slot['end'].astimezone(pytz.UTC)
-        new_event.add('dtstart', start_utc)
-        new_event.add('dtend', end_utc)
-        cal.add_component(new_event)
-
-    return cal
\ No newline at end of file
+        start_utc = slot['start'].astimezone(timezone.utc)
+        end_utc = slot['end'].astimezone(timezone.utc)
+        out += b"BEGIN:VEVENT\r\n"
+        out += summary
+        out += f"DTSTART:{start_utc:%Y%m%dT%H%M%SZ}\r\nDTEND:{end_utc:%Y%m%dT%H%M%SZ}\r\n".encode('ascii')
+        out += b"END:VEVENT\r\n"
+
+    out += b"END:VCALENDAR\r\n"
+    return bytes(out)
@@ -2,11 +2,30 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import io
+from collections import defaultdict
 from calendar_utils import parse_ics, export_ics, get_calendar_preview
 from scheduler import find_optimal_slots
 from database import get_db, MeetingPreference, ScheduledMeeting
 from sqlalchemy.orm import Session
 
+# Keep only a few recent uploads cached so large calendars don't pile up in memory
+@st.cache_data(show_spinner=False, max_entries=8, ttl=3600)
+def _parse_cached(file_bytes):
+    """Parse an uploaded calendar once per distinct file instead of on every rerun"""
+    return parse_ics(io.BytesIO(file_bytes))
+
+# Slots depend on the current date, so let cached schedules expire
+@st.cache_data(show_spinner=False, max_entries=8, ttl=3600)
+def _find_slots_cached(file_bytes, preferred_time, duration, recurrence, months_ahead):
+    """Find optimal slots once per calendar and preference combination"""
+    return find_optimal_slots(
+        _parse_cached(file_bytes),
+        preferred_time,
+        duration,
+        recurrence,
+        months_ahead
+    )
+
 # Initialize database session
 try:
     db = next(get_db())
@@ -30,7 +49,8 @@ uploaded_file = st.file_uploader("Upload your .ics calendar file", type=['ics'])
 
 if uploaded_file:
     try:
-        existing_events = parse_ics(uploaded_file)
+        calendar_bytes = uploaded_file.getvalue()
+        existing_events = _parse_cached(calendar_bytes)
         st.success("Calendar file successfully loaded!")
 
         # Meeting preferences
@@ -74,23 +94,25 @@ if uploaded_file:
                     db.commit()
 
                     # Calculate optimal slots
-                    optimal_slots = find_optimal_slots(
-                        existing_events,
+                    optimal_slots = _find_slots_cached(
+                        calendar_bytes,
                         preferred_time,
                         duration,
                         recurrence,
                         months_ahead
                     )
 
-                    # Save scheduled meetings to database
-                    for slot in optimal_slots:
-                        meeting = ScheduledMeeting(
+                    # Save scheduled meetings to database in one batch
+                    meetings = [
+                        ScheduledMeeting(
                             preference_id=pref.id,
                             start_time=slot['start'],
                             end_time=slot['end'],
                             title=meeting_title
                         )
-                        db.add(meeting)
+                        for slot in optimal_slots
+                    ]
+                    db.add_all(meetings)
                     db.commit()
 
                     # Display results with option to modify
@@ -104,7 +126,7 @@ if uploaded_file:
 
                         st.download_button(
                             label="Download New Meetings Calendar",
-                            data=new_calendar.to_ical(),
+                            data=new_calendar,
                             file_name="new_meetings.ics",
                             mime="text/calendar"
                         )
@@ -121,18 +143,28 @@ if uploaded_file:
 try:
     with st.expander("View and Modify Past Schedules"):
         past_prefs = db.query(MeetingPreference).filter_by(is_active=True).all()
+
+        # Load meetings for all preferences in one query instead of one per preference
+        meetings_by_pref = defaultdict(list)
+        if past_prefs:
+            past_meetings = db.query(ScheduledMeeting).filter(
+                ScheduledMeeting.preference_id.in_([p.id for p in past_prefs])
+            ).all()
+            for m in past_meetings:
+                meetings_by_pref[m.preference_id].append(m)
+
         for pref in past_prefs:
             st.write(f"### {pref.title}")
             st.write(f"Recurrence: {pref.recurrence_pattern}")
             st.write(f"Preferred Time: {pref.preferred_time}")
 
-            meetings = db.query(ScheduledMeeting).filter_by(preference_id=pref.id).all()
+            meetings = meetings_by_pref[pref.id]
             if meetings:
-                meeting_data = [{
-                    'Date': m.start_time.strftime('%Y-%m-%d'),
-                    'Start Time': m.start_time.strftime('%H:%M'),
-                    'End Time': m.end_time.strftime('%H:%M')
-                } for m in meetings]
+                meeting_data = {
+                    'Date': [m.start_time.strftime('%Y-%m-%d') for m in meetings],
+                    'Start Time': [m.start_time.strftime('%H:%M') for m in meetings],
+                    'End Time': [m.end_time.strftime('%H:%M') for m in meetings]
+                }
                 st.dataframe(pd.DataFrame(meeting_data))
 
                 # Option to export just these meetings
@@ -144,7 +176,7 @@ try:
                     calendar = export_ics(slots, pref.title)
                     st.download_button(
                         label=f"Download {pref.title} Calendar",
-                        data=calendar.to_ical(),
+                        data=calendar,
                         file_name=f"{pref.title.lower().replace(' ', '_')}.ics",
                         mime="text/calendar",
                         key=f"download_{pref.id}"
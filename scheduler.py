@@ -1,26 +1,61 @@
-from datetime import datetime, timedelta
-import pytz
-from dateutil.relativedelta import relativedelta, TH, FR
-from dateutil.rrule import rrule, MONTHLY, WEEKLY
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
 import logging
+from scheduler_kernels import busy_slot_mask
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Define EST timezone
-EST = pytz.timezone('America/New_York')
+EST = ZoneInfo('America/New_York')
+
+# Reference point for converting aware datetimes to int64 nanoseconds
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Slot search constants
+SLOT_STEP = timedelta(minutes=30)
+MINUTE_NS = 60 * 1_000_000_000
+SLOT_STEP_NS = 30 * MINUTE_NS
+BUFFER_NS = 15 * MINUTE_NS  # 15-minute buffer around meetings
+
+# Try up to 4 weeks forward and backward, nearest first
+NEARBY_WEEK_OFFSETS = np.array([1, -1, 2, -2, 3, -3, 4, -4])
 
 def find_optimal_slots(existing_events, preferred_time, duration, recurrence, months_ahead):
-    """Find optimal meeting slots based on preferences and existing schedule"""
+    """Find optimal meeting slots based on preferences and existing schedule
 
-    # Ensure all existing events are in EST timezone
-    existing_events = normalize_events_timezone(existing_events)
+    existing_events must already be in EST, as returned by parse_ics.
+    """
 
     # Convert preferred time to EST datetime
     now = datetime.now(EST)
     end_date = now + relativedelta(months=months_ahead)
 
+    # Only events touching the scheduling window (from the start of today) can conflict
+    window_start = datetime.combine(now.date(), datetime.min.time(), tzinfo=EST)
+    window_end = end_date + timedelta(days=1)
+    existing_events = [
+        event for event in existing_events
+        if event['end'] >= window_start and event['start'] <= window_end
+    ]
+
+    # Slots never leave their day, so each day is only checked against its own events
+    day_index = build_day_index(existing_events, window_start.date(), window_end.date())
+    no_events = build_event_index([])
+
+    # Events and preferences are fixed for this run, so each day only needs
+    # to be searched once even when nearby-date retries revisit it
+    @lru_cache(maxsize=None)
+    def search_day(day):
+        starts_ns, ends_ns = day_index.get(day, no_events)
+        return find_available_slot_on_day(day, preferred_time, duration, starts_ns, ends_ns)
+
     # Generate candidate dates based on recurrence pattern
     candidate_dates = generate_candidate_dates(now, end_date, recurrence)
 
@@ -28,15 +63,11 @@ def find_optimal_slots(existing_events, preferred_time, duration, recurrence, mo
     optimal_slots = []
 
     for base_date in candidate_dates:
-        logger.info(f"Searching for slots on {base_date.strftime('%Y-%m-%d')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Searching for slots on %s", base_date.date())
 
         # Try to find a slot on this day
-        slot = find_available_slot_on_day(
-            base_date,
-            preferred_time,
-            duration,
-            existing_events
-        )
+        slot = search_day(base_date.date())
 
         if slot:
             optimal_slots.append(slot)
@@ -45,9 +76,7 @@ def find_optimal_slots(existing_events, preferred_time, duration, recurrence, mo
         # If no slot found, try nearby dates with same weekday
         nearby_slot = find_slot_on_nearby_dates(
             base_date,
-            preferred_time,
-            duration,
-            existing_events,
+            search_day,
             end_date,
             now
         )
@@ -55,144 +84,131 @@ def find_optimal_slots(existing_events, preferred_time, duration, recurrence, mo
         if nearby_slot:
             optimal_slots.append(nearby_slot)
 
+    logger.info("Found %d slots for %d candidate dates", len(optimal_slots), len(candidate_dates))
     return optimal_slots
 
-def normalize_events_timezone(events):
-    """Ensure all events are in EST timezone"""
-    normalized = []
+def to_ns(dt):
+    """Convert an aware datetime to int64 nanoseconds since the epoch"""
+    return (dt - EPOCH) // timedelta(microseconds=1) * 1000
+
+def build_event_index(events):
+    """Build sorted event start times and running-max end times in nanoseconds"""
+    starts_ns = np.array([to_ns(event['start']) for event in events], dtype='int64')
+    ends_ns = np.array([to_ns(event['end']) for event in events], dtype='int64')
+
+    order = np.argsort(starts_ns, kind='stable')
+    starts_ns = starts_ns[order]
+    # Running max of ends lets a single lookup cover out-of-order (nested) intervals
+    ends_ns = np.maximum.accumulate(ends_ns[order])
+
+    return starts_ns, ends_ns
+
+def build_day_index(events, first_day, last_day):
+    """Bucket events by the EST days they touch and index each bucket
+
+    Events spanning midnight land in every day they cover, clipped to
+    first_day..last_day. Returns a dict of date -> build_event_index result.
+    """
+    buckets = defaultdict(list)
     for event in events:
-        start = event['start'].astimezone(EST)
-        end = event['end'].astimezone(EST)
-        normalized.append({
-            'summary': event['summary'],
-            'start': start,
-            'end': end
-        })
-    return normalized
+        day = max(event['start'].date(), first_day)
+        end_day = min(event['end'].date(), last_day)
+        while day <= end_day:
+            buckets[day].append(event)
+            day += timedelta(days=1)
+
+    return {day: build_event_index(day_events) for day, day_events in buckets.items()}
 
 def generate_candidate_dates(start_date, end_date, recurrence):
-    """Generate dates based on recurrence pattern"""
-    if recurrence == "First Thursday of each month":
-        dates = list(rrule(
-            MONTHLY,
-            dtstart=start_date,
-            until=end_date,
-            byweekday=[TH(1)]
-        ))
-    elif recurrence == "Last Friday of each month":
-        dates = list(rrule(
-            MONTHLY,
-            dtstart=start_date,
-            until=end_date,
-            byweekday=[FR(-1)]
-        ))
+    """Generate dates based on recurrence pattern
+
+    Returns a DatetimeIndex of calendar days (naive midnights) between the
+    dates of start_date and end_date inclusive.
+    """
+    first_day = pd.Timestamp(start_date.date())
+    last_day = pd.Timestamp(end_date.date())
+
+    if recurrence in ("First Thursday of each month", "Last Friday of each month"):
+        months = pd.date_range(first_day.replace(day=1), last_day, freq='MS')
+
+        if recurrence == "First Thursday of each month":
+            # Move each month start forward to its Thursday
+            dates = months + pd.to_timedelta((3 - months.weekday) % 7, unit='D')
+        else:
+            # Move each month end back to its Friday
+            month_ends = months + pd.offsets.MonthEnd(0)
+            dates = month_ends - pd.to_timedelta((month_ends.weekday - 4) % 7, unit='D')
+
+        dates = dates[(dates >= first_day) & (dates <= last_day)]
     elif recurrence == "Every two weeks":
-        dates = list(rrule(
-            WEEKLY,
-            interval=2,
-            dtstart=start_date,
-            until=end_date
-        ))
+        dates = pd.date_range(first_day, last_day, freq='14D')
     else:  # Weekly
-        dates = list(rrule(
-            WEEKLY,
-            dtstart=start_date,
-            until=end_date
-        ))
+        dates = pd.date_range(first_day, last_day, freq='7D')
 
     return dates
 
-def find_available_slot_on_day(date, preferred_time, duration, existing_events):
+def find_available_slot_on_day(date, preferred_time, duration, starts_ns, ends_ns):
     """Find an available slot on a specific day"""
+    day = date.date() if isinstance(date, datetime) else date
+
     # Convert date to datetime at 9 AM EST
-    day_start = datetime.combine(
-        date.date() if isinstance(date, datetime) else date,
-        datetime.min.time().replace(hour=9)
-    )
-    day_start = EST.localize(day_start)
+    day_start = datetime.combine(day, datetime.min.time().replace(hour=9), tzinfo=EST)
 
     # End time is 5 PM EST
     day_end = day_start.replace(hour=17)
 
     # Start searching from preferred time if it's within business hours
-    preferred_datetime = datetime.combine(
-        date.date() if isinstance(date, datetime) else date,
-        preferred_time
-    )
-    preferred_datetime = EST.localize(preferred_datetime)
-
     if 9 <= preferred_time.hour < 17:
-        current_time = preferred_datetime
+        current_time = datetime.combine(day, preferred_time, tzinfo=EST)
     else:
         current_time = day_start
 
-    # Try every 30-minute slot during business hours
-    while current_time < day_end:
-        slot = {
-            'start': current_time,
-            'end': current_time + timedelta(minutes=duration)
-        }
+    # Business hours form a fixed grid of at most 16 half-hour slots, so the
+    # whole day fits in one bitmask; count the slots that still end by 5 PM
+    duration_ns = duration * MINUTE_NS
+    first_ns = to_ns(current_time)
+    last_ns = to_ns(day_end) - duration_ns
+    n_slots = (last_ns - first_ns) // SLOT_STEP_NS + 1 if first_ns <= last_ns else 0
 
-        # Don't let meetings go past business hours
-        if slot['end'] > day_end:
-            break
-
-        if not has_conflict(slot, existing_events):
-            logger.info(f"Found available slot: {slot['start']} - {slot['end']} EST")
-            return slot
+    busy = busy_slot_mask(first_ns, n_slots, SLOT_STEP_NS, duration_ns, BUFFER_NS, starts_ns, ends_ns)
+    free = ~busy & ((1 << n_slots) - 1)
 
-        current_time += timedelta(minutes=30)
+    # Take the earliest free slot (lowest set bit)
+    if free:
+        start = current_time + SLOT_STEP * ((free & -free).bit_length() - 1)
+        slot = {
+            'start': start,
+            'end': start + timedelta(minutes=duration)
+        }
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found available slot: %s - %s EST", slot['start'], slot['end'])
+        return slot
 
-    logger.info(f"No available slots found on {date.strftime('%Y-%m-%d')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("No available slots found on %s", day)
     return None
 
-def find_slot_on_nearby_dates(base_date, preferred_time, duration, existing_events, end_date, start_date):
-    """Try to find slots on nearby dates, preferring the same day of the week"""
-    original_weekday = base_date.weekday()
+def find_slot_on_nearby_dates(base_date, search_day, end_date, start_date):
+    """Try to find slots on nearby dates, preferring the same day of the week
 
-    # Try up to 4 weeks forward and backward
-    for week_offset in [1, -1, 2, -2, 3, -3, 4, -4]:
-        test_date = base_date + timedelta(weeks=week_offset)
+    search_day is called with each candidate date and returns a slot or None.
+    """
+    day_ords = base_date.toordinal() + 7 * NEARBY_WEEK_OFFSETS
 
-        # Don't go beyond the scheduling window
-        if test_date > end_date or test_date < start_date:
-            continue
+    # Don't go beyond the scheduling window; the first day is only ever a
+    # primary candidate, never a fallback
+    in_window = (day_ords <= end_date.toordinal()) & (day_ords > start_date.toordinal())
 
-        logger.info(f"Trying alternate date: {test_date.strftime('%Y-%m-%d')}")
+    for week_offset, day_ord in zip(NEARBY_WEEK_OFFSETS[in_window], day_ords[in_window]):
+        test_date = date.fromordinal(int(day_ord))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Trying alternate date: %s", test_date)
 
-        slot = find_available_slot_on_day(
-            test_date,
-            preferred_time,
-            duration,
-            existing_events
-        )
+        slot = search_day(test_date)
 
         if slot:
-            logger.info(f"Found slot {week_offset} weeks from original date")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Found slot %d weeks from original date", week_offset)
             return slot
 
     return None
-
-def has_conflict(slot, existing_events):
-    """Check if a slot conflicts with existing events"""
-    buffer_time = timedelta(minutes=15)  # 15-minute buffer
-
-    # Add buffer to the slot times
-    slot_start = slot['start'] - buffer_time
-    slot_end = slot['end'] + buffer_time
-
-    for event in existing_events:
-        # Skip events that are clearly outside our time range
-        if event['end'] < slot_start or event['start'] > slot_end:
-            continue
-
-        # Check for any overlap
-        if (slot_start < event['end'] and slot_end > event['start']):
-            logger.info(
-                f"Conflict found: Slot {slot['start']} - {slot['end']} "
-                f"conflicts with event {event['summary']}: "
-                f"{event['start']} - {event['end']}"
-            )
-            return True
-
-    return False
\ No newline at end of file
@@ -0,0 +1,33 @@
+import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def busy_slot_mask(first_start, n_slots, step_ns, duration_ns, buf_ns, ev_starts, ev_ends):
+    """Return a bitmask of the day's slots where bit i is set if slot i is taken
+
+    Slot i starts at first_start + i * step_ns. All times are int64
+    nanoseconds; events must be sorted by start with ev_ends holding the
+    running max of their end times.
+    """
+    busy = 0
+    if n_slots <= 0:
+        return busy
+
+    # Buffered span covered by any slot of the day
+    window_start = first_start - buf_ns
+    window_end = first_start + (n_slots - 1) * step_ns + duration_ns + buf_ns
+
+    # Ends are non-decreasing, so skip straight past events finished before the window
+    j = np.searchsorted(ev_ends, window_start, side='right')
+    while j < ev_starts.shape[0] and ev_starts[j] < window_end:
+        # Slot i overlaps when its buffered span crosses the event:
+        # ev_start - duration - buf < start_i < ev_end + buf
+        lo = (ev_starts[j] - duration_ns - buf_ns - first_start) // step_ns + 1
+        hi = -((first_start - ev_ends[j] - buf_ns) // step_ns)
+        lo = max(lo, 0)
+        hi = min(hi, n_slots)
+        if lo < hi:
+            busy |= ((1 << hi) - 1) ^ ((1 << lo) - 1)
+        j += 1
+
+    return busy